@@ -1,29 +1,93 @@
 #!/usr/bin/env python3
 import os
 import sys
-import re
+import glob
+import functools
 import subprocess
 import json
 import shutil
+import tempfile
+from collections import deque
 from urllib.parse import urlparse, parse_qs
 
+try:
+    from diskcache import Cache
+    _cache = Cache(os.path.expanduser("~/.cache/yt_dl_gui"))
+except ImportError:
+    _cache = None
 
-def sanitize_filename(title):
-    """Sanitize the filename by removing invalid characters."""
-    # Replace invalid file characters
-    return re.sub(r'[\\/*?:"<>|]', "", title)
+try:
+    # Importing yt_dlp once and downloading in-process skips the interpreter
+    # start-up and extractor registration cost of every subprocess call
+    from yt_dlp import YoutubeDL
+except ImportError:
+    YoutubeDL = None  # fall back to the yt-dlp binary on PATH
+
+VIDEO_FORMAT = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+
+# This app is YouTube-only: the android player client skips the base.js
+# signature-decipher path, and a persistent cache dir keeps the player data
+# across runs. The retry path falls back to yt-dlp's default clients.
+YTDLP_CACHE_DIR = os.path.expanduser("~/.cache/yt-dlp")
+YTDLP_SPEEDUP_ARGS = [
+    "--extractor-args", "youtube:player_client=android",
+    "--cache-dir", YTDLP_CACHE_DIR,
+]
+
+# Metadata entries expire after 24 hours
+CACHE_TTL = 86400
+
+
+@functools.lru_cache(maxsize=None)
+def _video_id(url):
+    """Extract the canonical YouTube video ID from a URL.
+
+    Keying the cache on the ID (not the raw URL) means &t=/&list= variants
+    and youtu.be short links all hit the same entry.
+    """
+    parsed = urlparse(url)
+    video_ids = parse_qs(parsed.query).get('v')
+    if video_ids:
+        return video_ids[0]
+    # youtu.be/<id> and /shorts/<id> style URLs
+    return parsed.path.rstrip('/').rsplit('/', 1)[-1] or url
+
+
+def get_cached_info(url):
+    """Return cached video metadata for the URL, or None on a miss."""
+    if _cache is None:
+        return None
+    return _cache.get(_video_id(url))
+
+
+def store_cached_info(url, video_info):
+    """Remember video metadata so later runs skip the network fetch."""
+    if _cache is not None and video_info:
+        _cache.set(_video_id(url), video_info, expire=CACHE_TTL, tag="meta")
+
+
+def clear_cache():
+    """Drop all cached video metadata."""
+    if _cache is not None:
+        _cache.clear()
+
+
+@functools.lru_cache(maxsize=None)
+def _which(name):
+    """shutil.which with the PATH scan done once per executable."""
+    return shutil.which(name)
 
 
 def check_dependencies():
     """Check if required dependencies are installed."""
     missing_deps = []
-    
-    # Check for yt-dlp
-    if not shutil.which('yt-dlp'):
+
+    # The yt-dlp binary is only needed when the module isn't importable
+    if YoutubeDL is None and not _which('yt-dlp'):
         missing_deps.append('yt-dlp')
-    
+
     # Check for ffmpeg
-    if not shutil.which('ffmpeg'):
+    if not _which('ffmpeg'):
         missing_deps.append('ffmpeg')
     
     if missing_deps:
@@ -34,94 +98,252 @@ def check_dependencies():
     return True
 
 
-def get_video_info(url):
-    """Get video info using yt-dlp."""
-    try:
-        cmd = ["yt-dlp", "--dump-json", url]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            print(f"Error getting video info: {result.stderr}")
+def load_info_json(video_file):
+    """Load the .info.json sidecar written next to the video and clean it up."""
+    info_file = os.path.splitext(video_file)[0] + ".info.json"
+    if not os.path.exists(info_file):
+        # Fall back to the newest sidecar in the output directory
+        candidates = glob.glob(os.path.join(os.path.dirname(video_file), "*.info.json"))
+        if not candidates:
             return None
-            
-        video_info = json.loads(result.stdout)
-        return video_info
-    except Exception as e:
-        print(f"Error while getting video info: {str(e)}")
+        info_file = max(candidates, key=os.path.getmtime)
+
+    try:
+        with open(info_file) as f:
+            video_info = json.load(f)
+    except (OSError, json.JSONDecodeError):
         return None
 
+    os.remove(info_file)
+    return video_info
+
+
+def _run_streamed(cmd, on_line=None):
+    """Run cmd, streaming merged stdout/stderr line by line.
+
+    Returns (returncode, tail) where tail holds the last few output lines
+    for error reporting. Unlike capture_output=True, this never buffers the
+    whole transcript in memory.
+    """
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        bufsize=1,
+        universal_newlines=True
+    )
+    tail = deque(maxlen=20)
+    for line in iter(process.stdout.readline, ""):
+        line = line.rstrip("\n")
+        tail.append(line)
+        if on_line:
+            on_line(line)
+    process.stdout.close()
+    process.wait()
+    return process.returncode, "\n".join(tail)
+
+
+def _api_download(url, ydl_opts, info=None):
+    """Run one in-process yt-dlp download; returns the sanitized info dict.
+
+    When info (previously extracted metadata) is given, yt-dlp goes
+    straight to format resolution and download without another extractor
+    round-trip.
+    """
+    with YoutubeDL(ydl_opts) as ydl:
+        if info is not None:
+            result = ydl.process_ie_result(dict(info), download=True)
+        else:
+            result = ydl.extract_info(url, download=True)
+        return ydl.sanitize_info(result)
+
+
+def _download_mp4(url, output_template, extract_mp3=False, cached_info=None):
+    """Download the MP4 video; returns (file path, metadata dict or None).
+
+    With extract_mp3, the same invocation also produces the MP3 through
+    yt-dlp's internal ffmpeg step (--keep-video -x), which reads the
+    already-demuxed audio stream instead of making a second pass over the
+    video file on disk. cached_info, when given, spares yt-dlp the
+    extraction round-trip entirely; since cached format URLs go stale well
+    before the metadata TTL, a failure first retries with a fresh
+    extraction at the same format and only then falls back to 'best'.
+    """
+    if YoutubeDL is not None:
+        ydl_opts = {
+            'quiet': True,
+            'noprogress': True,
+            'format': VIDEO_FORMAT,
+            'outtmpl': output_template,
+            'extractor_args': {'youtube': {'player_client': ['android']}},
+            'cachedir': YTDLP_CACHE_DIR,
+        }
+        if extract_mp3:
+            ydl_opts['keepvideo'] = True
+            ydl_opts['postprocessors'] = [{
+                'key': 'FFmpegExtractAudio',
+                'preferredcodec': 'mp3',
+                'preferredquality': '0',
+            }]
+        try:
+            info = _api_download(url, ydl_opts, info=cached_info)
+        except Exception as e:
+            print(f"Error downloading video: {e}")
+            info = None
+            if cached_info is not None:
+                # Likely just stale format URLs; a fresh extraction keeps
+                # the preferred format
+                try:
+                    info = _api_download(url, ydl_opts)
+                except Exception as e:
+                    print(f"Error downloading video (fresh extraction): {e}")
+            if info is None:
+                # Try simpler format selection and the default player
+                # clients as the last resort
+                ydl_opts['format'] = 'best'
+                ydl_opts.pop('extractor_args', None)
+                try:
+                    info = _api_download(url, ydl_opts)
+                except Exception as e:
+                    print(f"Error downloading video (second attempt): {e}")
+                    return None, None
+
+        downloads = info.get('requested_downloads') or []
+        video_file = downloads[0].get('filepath') if downloads else None
+        return video_file, info
+
+    # Fall back to the yt-dlp binary when the module is not importable
+    found_paths = []
+
+    def _watch(line):
+        # The bare path printed by --print after_move
+        if os.path.isfile(line):
+            found_paths.append(line)
+
+    extract_args = []
+    if extract_mp3:
+        extract_args = [
+            "--keep-video",
+            "-x",  # Extract audio
+            "--audio-format", "mp3",
+            "--audio-quality", "0",  # Best quality
+        ]
+
+    # With cached metadata, --load-info-json skips the extraction and goes
+    # straight to format resolution + download
+    tmp_info = None
+    if cached_info:
+        tmp_info = tempfile.NamedTemporaryFile(
+            mode="w", suffix=".info.json", delete=False)
+        json.dump(cached_info, tmp_info)
+        tmp_info.close()
+
+    try:
+        video_cmd = [
+            "yt-dlp",
+            "-f", VIDEO_FORMAT,
+            "--write-info-json",
+            "--print", "after_move:%(filepath)s",
+            "-o", output_template,
+            *YTDLP_SPEEDUP_ARGS,
+            *extract_args,
+        ]
+        if tmp_info is not None:
+            video_cmd += ["--load-info-json", tmp_info.name]
+        else:
+            video_cmd.append(url)
+        returncode, tail = _run_streamed(video_cmd, _watch)
+
+        if returncode != 0 and tmp_info is not None:
+            print(f"Error downloading video: {tail}")
+            # Likely just stale format URLs; a fresh extraction keeps the
+            # preferred format
+            video_cmd = [
+                "yt-dlp",
+                "-f", VIDEO_FORMAT,
+                "--write-info-json",
+                "--print", "after_move:%(filepath)s",
+                "-o", output_template,
+                *YTDLP_SPEEDUP_ARGS,
+                *extract_args,
+                url
+            ]
+            returncode, tail = _run_streamed(video_cmd, _watch)
+
+        if returncode != 0:
+            print(f"Error downloading video: {tail}")
+            # Try simpler format selection and the default player clients
+            # as the last resort
+            video_cmd = [
+                "yt-dlp",
+                "-f", "best",
+                "--write-info-json",
+                "--print", "after_move:%(filepath)s",
+                "-o", output_template,
+                *extract_args,
+                url
+            ]
+            returncode, tail = _run_streamed(video_cmd, _watch)
+            if returncode != 0:
+                print(f"Error downloading video (second attempt): {tail}")
+                return None, None
+    finally:
+        if tmp_info is not None:
+            os.unlink(tmp_info.name)
+
+    # --print after_move gives us the final path, so yt-dlp's own filename
+    # sanitization is the single source of truth for file names.
+    return (found_paths[-1] if found_paths else None), None
+
 
 def download_video(url, output_path="downloads"):
     """Download YouTube video and extract audio using yt-dlp and ffmpeg."""
     if not check_dependencies():
         return False
-        
+
     try:
-        # Create the output directory if it doesn't exist
-        if not os.path.exists(output_path):
-            os.makedirs(output_path)
-        
-        # Get video info first
-        print("Getting video information...")
-        video_info = get_video_info(url)
-        
-        if not video_info:
-            print("Failed to get video information")
+        # Resolve the output directory once and reuse it everywhere below
+        abs_out = os.path.abspath(output_path)
+        os.makedirs(abs_out, exist_ok=True)
+
+        # A cache hit tells us the title before any network traffic
+        cached_info = get_cached_info(url)
+        if cached_info:
+            print(f"Downloading: {cached_info.get('title', 'video')}")
+
+        output_template = os.path.join(abs_out, "%(title)s.%(ext)s")
+
+        # One yt-dlp invocation downloads the video and extracts the MP3
+        # from the already-demuxed audio stream (--keep-video -x): a single
+        # network fetch and a single pass over the bytes on disk.
+        print("Downloading MP4 (video) and extracting MP3 (audio)...")
+        video_file, video_info = _download_mp4(url, output_template,
+                                               extract_mp3=True,
+                                               cached_info=cached_info)
+
+        if not video_file:
             return False
-            
-        # Get video title
-        video_title = video_info.get('title', 'video')
-        sanitized_title = sanitize_filename(video_title)
-        
-        print(f"\nDownloading: {video_title}")
-        
-        # File paths
-        video_file = os.path.join(output_path, f"{sanitized_title}.mp4")
-        audio_file = os.path.join(output_path, f"{sanitized_title}.mp3")
-        
-        # Download MP4 video
-        print("\nDownloading MP4 (video)...")
-        video_cmd = [
-            "yt-dlp", 
-            "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best", 
-            "-o", video_file,
-            url
-        ]
-        video_result = subprocess.run(video_cmd, capture_output=True, text=True)
-        
-        if video_result.returncode != 0:
-            print(f"Error downloading video: {video_result.stderr}")
-            # Try simpler format selection if first attempt fails
-            video_cmd = ["yt-dlp", "-f", "best", "-o", video_file, url]
-            video_result = subprocess.run(video_cmd, capture_output=True, text=True)
-            if video_result.returncode != 0:
-                print(f"Error downloading video (second attempt): {video_result.stderr}")
-                return False
-        
+
+        if video_info is None:
+            # Subprocess fallback: the metadata lives in the sidecar file
+            video_info = load_info_json(video_file)
+        if video_info:
+            store_cached_info(url, video_info)
+            print(f"Downloaded: {video_info.get('title', 'video')}")
+
+        base, ext = os.path.splitext(video_file)
+        if ext.lower() == ".mp3":
+            # With --keep-video -x, the extract-audio step reports the MP3
+            # as the final file path; recover the kept video's path from
+            # the metadata
+            video_file = base + "." + ((video_info or {}).get('ext') or "mp4")
+
         print(f"MP4 download complete: {video_file}")
-        
-        # Extract MP3 audio
-        print("\nExtracting MP3 (audio)...")
-        audio_cmd = [
-            "ffmpeg",
-            "-i", video_file,
-            "-vn",  # No video
-            "-acodec", "libmp3lame",
-            "-q:a", "2",  # High quality audio
-            audio_file,
-            "-y"  # Overwrite if exists
-        ]
-        audio_result = subprocess.run(audio_cmd, capture_output=True, text=True)
-        
-        if audio_result.returncode != 0:
-            print(f"Error extracting audio: {audio_result.stderr}")
-            return False
-            
-        print(f"MP3 extraction complete: {audio_file}")
-        print(f"\nFiles saved to: {os.path.abspath(output_path)}")
-        
+        print(f"MP3 download complete: {base}.mp3")
+        print(f"\nFiles saved to: {abs_out}")
+
         return True
-        
+
     except Exception as e:
         print(f"Error: {str(e)}")
         return False
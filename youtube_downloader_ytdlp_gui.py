@@ -1,21 +1,201 @@
 #!/usr/bin/env python3
 import os
 import sys
-import re
+import asyncio
+import glob
 import json
+import functools
+import signal
 import subprocess
 import shutil
 import threading
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                            QHBoxLayout, QLabel, QLineEdit, QPushButton, 
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs
+from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout,
+                            QHBoxLayout, QLabel, QLineEdit, QPushButton,
                             QProgressBar, QFileDialog, QMessageBox, QGroupBox,
-                            QCheckBox)
-from PyQt5.QtCore import Qt, pyqtSignal, QObject
+                            QCheckBox, QPlainTextEdit, QRadioButton)
+from PyQt5.QtCore import Qt, pyqtSignal, QObject, QTimer
 
+try:
+    from diskcache import Cache
+    _cache = Cache(os.path.expanduser("~/.cache/yt_dl_gui"))
+except ImportError:
+    _cache = None
 
-def sanitize_filename(title):
-    """Sanitize the filename by removing invalid characters."""
-    return re.sub(r'[\\/*?:"<>|]', "", title)
+try:
+    # Importing yt_dlp once and downloading in-process skips the interpreter
+    # start-up and extractor registration cost of every subprocess call
+    from yt_dlp import YoutubeDL
+    from yt_dlp.utils import DownloadCancelled
+except ImportError:
+    YoutubeDL = None  # fall back to the yt-dlp binary on PATH
+    DownloadCancelled = None
+
+# Launch children in their own process group/session so cancellation can
+# signal the whole yt-dlp/ffmpeg tree at once
+if os.name == 'posix':
+    _GROUP_KWARGS = {'start_new_session': True}
+else:
+    _GROUP_KWARGS = {'creationflags': getattr(subprocess, 'CREATE_NEW_PROCESS_GROUP', 0)}
+
+VIDEO_FORMAT = "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best"
+
+# This app is YouTube-only: the android player client skips the base.js
+# signature-decipher path, and a persistent cache dir keeps the player data
+# across runs. The retry path falls back to yt-dlp's default clients.
+YTDLP_CACHE_DIR = os.path.expanduser("~/.cache/yt-dlp")
+YTDLP_SPEEDUP_ARGS = [
+    "--extractor-args", "youtube:player_client=android",
+    "--cache-dir", YTDLP_CACHE_DIR,
+]
+
+# Shared bounded pool for the ffmpeg remux jobs; the yt-dlp downloads run
+# directly on their worker threads. ffmpeg is already multi-threaded per
+# process, so cap concurrent remux children at half the cores.
+_MEDIA_POOL = ThreadPoolExecutor(max_workers=max(2, (os.cpu_count() or 2) // 2))
+
+# Metadata entries expire after 24 hours
+CACHE_TTL = 86400
+
+# Container extension per source audio codec for the remux path
+AUDIO_CONTAINER = {
+    'mp4a': 'm4a',
+    'aac': 'm4a',
+    'opus': 'opus',
+    'vorbis': 'ogg',
+}
+
+# Line yt-dlp logs just before it writes the .info.json sidecar
+INFO_JSON_MARKER = "[info] Writing video metadata as JSON to: "
+
+# Machine-readable progress lines for the subprocess fallback: one
+# "dl|<percent>|<downloaded>|<total>" line per update instead of the
+# human-oriented progress bar we'd otherwise have to parse heuristically
+PROGRESS_TEMPLATE = "download:dl|%(progress._percent)s|%(progress.downloaded_bytes)s|%(progress.total_bytes)s"
+
+
+@functools.lru_cache(maxsize=None)
+def _which(name):
+    """shutil.which with the PATH scan done once per executable."""
+    return shutil.which(name)
+
+
+def _missing_dependencies():
+    """Names of required external tools not found on PATH."""
+    missing_deps = []
+
+    # The yt-dlp binary is only needed when the module isn't importable
+    if YoutubeDL is None and not _which('yt-dlp'):
+        missing_deps.append('yt-dlp')
+
+    # Check for ffmpeg
+    if not _which('ffmpeg'):
+        missing_deps.append('ffmpeg')
+
+    return missing_deps
+
+
+@functools.lru_cache(maxsize=None)
+def _video_id(url):
+    """Extract the canonical YouTube video ID from a URL.
+
+    Keying the cache on the ID (not the raw URL) means &t=/&list= variants
+    and youtu.be short links all hit the same entry.
+    """
+    parsed = urlparse(url)
+    video_ids = parse_qs(parsed.query).get('v')
+    if video_ids:
+        return video_ids[0]
+    # youtu.be/<id> and /shorts/<id> style URLs
+    return parsed.path.rstrip('/').rsplit('/', 1)[-1] or url
+
+
+def get_cached_info(url):
+    """Return cached video metadata for the URL, or None on a miss."""
+    if _cache is None:
+        return None
+    return _cache.get(_video_id(url))
+
+
+def store_cached_info(url, video_info):
+    """Remember video metadata so later runs skip the network fetch."""
+    if _cache is not None and video_info:
+        _cache.set(_video_id(url), video_info, expire=CACHE_TTL, tag="meta")
+
+
+def clear_cache():
+    """Drop all cached video metadata."""
+    if _cache is not None:
+        _cache.clear()
+
+
+async def _stream_subprocess(cmd, on_line, on_spawn=None):
+    """Spawn cmd on the event loop and forward its output line by line.
+
+    Without an on_line consumer the output is unwanted on success, so the
+    raw bytes are only kept for the tail and decoded if the process exits
+    non-zero — no per-line UTF-8 decode on the silent path. on_spawn, when
+    given, receives the process handle so the caller can cancel it.
+    """
+    process = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        **_GROUP_KWARGS,
+    )
+    if on_spawn is not None:
+        on_spawn(process)
+    tail = deque(maxlen=20)
+    async for raw in process.stdout:
+        if on_line is None:
+            tail.append(raw)
+        else:
+            line = raw.decode(errors="replace").rstrip("\n")
+            tail.append(line)
+            on_line(line)
+    await process.wait()
+
+    if on_line is None:
+        if process.returncode == 0:
+            return 0, ""
+        return (process.returncode,
+                b"".join(tail).decode(errors="replace").strip())
+    return process.returncode, "\n".join(tail)
+
+
+def _run_streamed(cmd, on_line=None, on_spawn=None):
+    """Run cmd, streaming merged stdout/stderr line by line.
+
+    Returns (returncode, tail) where tail holds the last few output lines
+    for error reporting. Backed by asyncio.create_subprocess_exec on an
+    event loop local to the calling worker thread, so several subprocesses
+    could be gathered on one loop without a blocked OS thread per process,
+    and nothing is buffered beyond the tail.
+    """
+    return asyncio.run(_stream_subprocess(cmd, on_line, on_spawn))
+
+
+def load_info_json(video_file):
+    """Load the .info.json sidecar written next to the video and clean it up."""
+    info_file = os.path.splitext(video_file)[0] + ".info.json"
+    if not os.path.exists(info_file):
+        # Fall back to the newest sidecar in the output directory
+        candidates = glob.glob(os.path.join(os.path.dirname(video_file), "*.info.json"))
+        if not candidates:
+            return None
+        info_file = max(candidates, key=os.path.getmtime)
+
+    try:
+        with open(info_file) as f:
+            video_info = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    os.remove(info_file)
+    return video_info
 
 
 class WorkerSignals(QObject):
@@ -24,187 +204,493 @@ class WorkerSignals(QObject):
     status = pyqtSignal(str)
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
-    log = pyqtSignal(str)
+    cancelled = pyqtSignal()
+    cache_hit = pyqtSignal(str)
 
 
 class DownloadWorker(threading.Thread):
     """Thread worker for downloading videos without freezing the UI."""
-    def __init__(self, url, output_path, download_video=True, download_audio=True):
+    def __init__(self, url, output_path, download_video=True, download_audio=True,
+                 audio_mode='mp3'):
         super().__init__()
         self.url = url
-        self.output_path = output_path
+        # Resolved once here; every later path join and the finished signal
+        # reuse the absolute form
+        self.output_path = os.path.abspath(output_path)
         self.download_video = download_video
         self.download_audio = download_audio
+        # 'mp3' re-encodes with libmp3lame; 'remux' copies the source audio
+        # stream into its own container without touching the codec
+        self.audio_mode = audio_mode
         self.signals = WorkerSignals()
         self.daemon = True
         self.process = None
+        self._cancelled = False
+        # Log lines are buffered here and drained in batches by a QTimer on
+        # the GUI side instead of one queued signal per line
+        self.log_lines = deque()
+        self._last_pct = -1
+        self._last_emit_ts = 0.0
     
     def check_dependencies(self):
         """Check if required dependencies are installed."""
-        missing_deps = []
-        
-        # Check for yt-dlp
-        if not shutil.which('yt-dlp'):
-            missing_deps.append('yt-dlp')
-        
-        # Check for ffmpeg
-        if not shutil.which('ffmpeg'):
-            missing_deps.append('ffmpeg')
-        
-        return missing_deps
-    
-    def get_video_info(self):
-        """Get video info using yt-dlp."""
-        self.signals.status.emit("Getting video information...")
-        self.signals.progress.emit(10)
-        
+        return _missing_dependencies()
+
+    def _log(self, text):
+        """Queue a log line for the GUI's batched flush."""
+        self.log_lines.append(text)
+
+    def _set_process(self, process):
+        self.process = process
+
+    def _error(self, msg):
+        """Report a failure — quietly when it was a user-requested cancel."""
+        if self._cancelled:
+            self.signals.status.emit("Download cancelled")
+            self.signals.cancelled.emit()
+        else:
+            self.signals.error.emit(msg)
+
+    def cancel(self):
+        """Stop the download, killing the whole child process group."""
+        self._cancelled = True
+        process = self.process
+        if process is not None and process.returncode is None:
+            try:
+                if os.name == 'posix':
+                    # start_new_session makes the child its own group leader
+                    os.killpg(process.pid, signal.SIGTERM)
+                else:
+                    process.send_signal(signal.CTRL_BREAK_EVENT)
+            except (ProcessLookupError, OSError):
+                pass
+
+    def _cancel_hook(self, d):
+        """yt-dlp progress hook that aborts an in-process download."""
+        if self._cancelled:
+            raise DownloadCancelled("Download cancelled")
+
+    def _emit_progress(self, value):
+        """Emit progress only when the value changed, at most ~20 Hz.
+
+        yt-dlp produces tens of updates per second; the GUI cannot paint
+        that fast, so skipping redundant emissions cuts the cross-thread
+        signal traffic. The terminal 100 always goes through.
+        """
+        if value == self._last_pct:
+            return
+        now = time.monotonic()
+        if value < 100 and now - self._last_emit_ts < 0.05:
+            return
+        self._last_pct = value
+        self._last_emit_ts = now
+        self.signals.progress.emit(value)
+
+    def _read_info_file(self, info_file):
+        """Read a freshly written .info.json and announce the title."""
         try:
-            cmd = ["yt-dlp", "--dump-json", self.url]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            
-            if result.returncode != 0:
-                error_msg = result.stderr or "Failed to get video information"
-                self.signals.error.emit(f"Error getting video info: {error_msg}")
-                return None
-                
-            video_info = json.loads(result.stdout)
-            self.signals.progress.emit(20)
-            return video_info
-        except Exception as e:
-            self.signals.error.emit(f"Error while getting video info: {str(e)}")
+            with open(info_file) as f:
+                video_info = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            # Sidecar not fully written yet; run() falls back to reading it
+            # after the download finishes
             return None
-    
+
+        store_cached_info(self.url, video_info)
+        self.signals.status.emit(f"Downloading: {video_info.get('title', 'video')}")
+        return video_info
+
+    def _api_download(self, ydl_opts, info=None):
+        """Run one in-process yt-dlp download; returns the sanitized info dict.
+
+        When info (previously extracted metadata) is given, yt-dlp goes
+        straight to format resolution and download without another
+        extractor round-trip.
+        """
+        with YoutubeDL(ydl_opts) as ydl:
+            if info is not None:
+                result = ydl.process_ie_result(dict(info), download=True)
+            else:
+                result = ydl.extract_info(self.url, download=True)
+            return ydl.sanitize_info(result)
+
+    def _video_hook(self, d):
+        """yt-dlp progress hook: map byte counts onto the 30-70 range."""
+        self._cancel_hook(d)
+        if d.get('status') != 'downloading':
+            return
+        # Announce the title as soon as the extractor has it
+        if self.video_info is None:
+            info = d.get('info_dict') or {}
+            title = info.get('title')
+            if title:
+                self.video_info = info
+                self.signals.status.emit(f"Downloading: {title}")
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        if total:
+            fraction = d.get('downloaded_bytes', 0) / total
+            # Scale progress to 30-70 range
+            self._emit_progress(int(30 + fraction * 40))
+
+    def _handle_video_line(self, line):
+        """Process one line of yt-dlp output from the video download."""
+        line = line.strip()
+        # Progress lines rendered from PROGRESS_TEMPLATE: no heuristics,
+        # no per-line exception handling
+        if line.startswith("dl|"):
+            _, pct, downloaded, total = line.split("|")
+            if pct != "NA":
+                # Scale progress to 30-70 range
+                self._emit_progress(int(30 + float(pct) * 0.4))
+            return
+
+        self._log(line)
+        # Emit the title as soon as the metadata sidecar appears
+        if self.video_info is None and line.startswith(INFO_JSON_MARKER):
+            self.video_info = self._read_info_file(line[len(INFO_JSON_MARKER):].strip())
+        # The bare path printed by --print after_move
+        elif os.path.isfile(line):
+            self.video_file = line
+
+    def _handle_audio_line(self, line):
+        """Process one line of yt-dlp output from the audio download."""
+        line = line.strip()
+        if line.startswith("dl|"):
+            _, pct, downloaded, total = line.split("|")
+            if pct != "NA":
+                # Scale progress to 30-70 range
+                self._emit_progress(int(30 + float(pct) * 0.4))
+            return
+        self._log(line)
+
+    def _download_video_task(self, output_template, extract_mp3=False):
+        """Download the MP4 video; returns True on success.
+
+        Sets self.video_file to the final path reported by yt-dlp and
+        self.video_info to the parsed metadata. With extract_mp3, the same
+        invocation also produces the MP3 through yt-dlp's internal ffmpeg
+        step (--keep-video -x), which reads the already-demuxed audio
+        stream instead of making a second pass over the video file.
+        """
+        if extract_mp3:
+            self.signals.status.emit("Downloading MP4 and extracting MP3...")
+        else:
+            self.signals.status.emit("Downloading MP4 (video)...")
+        self._log("\nDownloading video...")
+
+        if YoutubeDL is not None:
+            ydl_opts = {
+                'quiet': True,
+                'noprogress': True,
+                'format': VIDEO_FORMAT,
+                'outtmpl': output_template,
+                'progress_hooks': [self._video_hook],
+                'extractor_args': {'youtube': {'player_client': ['android']}},
+                'cachedir': YTDLP_CACHE_DIR,
+            }
+            if extract_mp3:
+                ydl_opts['keepvideo'] = True
+                ydl_opts['postprocessors'] = [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'mp3',
+                    'preferredquality': '0',
+                }]
+            self._emit_progress(30)
+            cached_info = self.video_info
+            try:
+                # A cached info dict (from a previous run on this video)
+                # spares the extraction round-trip
+                info = self._api_download(ydl_opts, info=cached_info)
+            except Exception:
+                # A cancel surfaces as DownloadCancelled from the progress
+                # hook; let run() report it rather than retrying
+                if self._cancelled:
+                    raise
+                info = None
+                if cached_info is not None:
+                    # Likely just stale format URLs; a fresh extraction
+                    # keeps the preferred format
+                    self._log("\nRefreshing video info...")
+                    try:
+                        info = self._api_download(ydl_opts)
+                    except Exception:
+                        if self._cancelled:
+                            raise
+                if info is None:
+                    # Try simpler format selection and the default player
+                    # clients as the last resort
+                    self.signals.status.emit("Trying alternative video format...")
+                    self._log("\nTrying alternative video format...")
+                    ydl_opts['format'] = 'best'
+                    ydl_opts.pop('extractor_args', None)
+                    try:
+                        info = self._api_download(ydl_opts)
+                    except Exception as e:
+                        self._error(f"Error downloading video: {e}")
+                        return False
+
+            store_cached_info(self.url, info)
+            self.video_info = info
+            downloads = info.get('requested_downloads') or []
+            if downloads:
+                self.video_file = downloads[0].get('filepath')
+
+            self._log("MP4 download complete!")
+            return True
+
+        # Fall back to the yt-dlp binary when the module is not importable.
+        # A single invocation fetches metadata and media together; the
+        # .info.json sidecar gives us the title without a separate
+        # --dump-json round-trip, and --print after_move reports the final
+        # (yt-dlp-sanitized) file path.
+        extract_args = []
+        if extract_mp3:
+            extract_args = [
+                "--keep-video",
+                "-x",  # Extract audio
+                "--audio-format", "mp3",
+                "--audio-quality", "0",  # Best quality
+            ]
+
+        video_cmd = [
+            "yt-dlp",
+            "-f", VIDEO_FORMAT,
+            "--write-info-json",
+            "--print", "after_move:%(filepath)s",
+            "-o", output_template,
+            "--progress",  # --print implies --quiet, which would drop the
+                           # progress lines and the info-json marker
+            "--newline",
+            "--progress-template", PROGRESS_TEMPLATE,
+            *YTDLP_SPEEDUP_ARGS,
+            *extract_args,
+            self.url
+        ]
+
+        self._emit_progress(30)
+        returncode, tail = _run_streamed(video_cmd, self._handle_video_line,
+                                         on_spawn=self._set_process)
+
+        if returncode != 0:
+            # A cancel kills the child, which also lands here; report it
+            # instead of retrying
+            if self._cancelled:
+                self._error(f"Error downloading video: {tail}")
+                return False
+            # Try simpler format selection if first attempt fails
+            self.signals.status.emit("Trying alternative video format...")
+            self._log("\nTrying alternative video format...")
+
+            video_cmd = [
+                "yt-dlp",
+                "-f", "best",
+                "--write-info-json",
+                "--print", "after_move:%(filepath)s",
+                "-o", output_template,
+                "--progress",
+                "--newline",
+                "--progress-template", PROGRESS_TEMPLATE,
+                *extract_args,
+                self.url
+            ]
+            returncode, tail = _run_streamed(video_cmd, self._handle_video_line,
+                                         on_spawn=self._set_process)
+
+            if returncode != 0:
+                self._error(f"Error downloading video: {tail}")
+                return False
+
+        if self.video_file:
+            # load_info_json also removes the sidecar
+            sidecar_info = load_info_json(self.video_file)
+            if sidecar_info:
+                store_cached_info(self.url, sidecar_info)
+                self.video_info = sidecar_info
+
+        self._log("MP4 download complete!")
+        return True
+
+    def _remux_audio_task(self):
+        """Copy the downloaded video's audio into its own container.
+
+        Stream copy (-c:a copy) rewrites the container without decoding or
+        encoding, so it is near-instant and lossless; the extension follows
+        the source codec reported in the metadata.
+        """
+        if not self.video_file:
+            self._error("Could not locate the downloaded video file")
+            return False
+
+        self.signals.status.emit("Remuxing audio...")
+        self._log("\nRemuxing audio (stream copy)...")
+
+        acodec = (self.video_info or {}).get('acodec') or ''
+        ext = AUDIO_CONTAINER.get(acodec.split('.')[0], 'm4a')
+        audio_file = os.path.splitext(self.video_file)[0] + "." + ext
+        audio_cmd = [
+            "ffmpeg",
+            "-hide_banner",  # Skip the build/config preamble on stderr
+            "-nostats",  # The \r-separated stats line would never give the
+                         # line-based stream reader a newline
+            "-nostdin",  # No terminal probing
+            "-i", self.video_file,
+            "-map", "0:a:0",  # First audio stream: deterministic on
+                              # multi-track videos, no best-stream probe
+            "-vn",  # No video
+            "-c:a", "copy",  # No decode, no encode
+            "-y",  # Overwrite if exists
+            audio_file
+        ]
+        # ffmpeg's transcript is pure noise on success; discard it and let
+        # the helper decode the tail only if the remux fails
+        returncode, tail = _run_streamed(audio_cmd, on_spawn=self._set_process)
+
+        if returncode != 0:
+            self._error(f"Error remuxing audio: {tail}")
+            return False
+
+        self._log("Audio remux complete!")
+        return True
+
+    def _download_audio_task(self, output_template):
+        """Download the audio directly with yt-dlp; returns True on success."""
+        if self.audio_mode == 'remux':
+            # Keep the source codec: fetch bestaudio in its native container,
+            # no transcode at all
+            self.signals.status.emit("Downloading audio...")
+            self._log("\nDownloading audio (source codec)...")
+
+            if YoutubeDL is not None:
+                ydl_opts = {
+                    'quiet': True,
+                    'noprogress': True,
+                    'format': 'bestaudio/best',
+                    'outtmpl': output_template,
+                    'progress_hooks': [self._cancel_hook],
+                    'extractor_args': {'youtube': {'player_client': ['android']}},
+                    'cachedir': YTDLP_CACHE_DIR,
+                }
+                try:
+                    self._api_download(ydl_opts)
+                except Exception as e:
+                    self._error(f"Error downloading audio: {e}")
+                    return False
+            else:
+                audio_cmd = ["yt-dlp", "-f", "bestaudio/best", "-o", output_template,
+                             "--newline", "--progress-template", PROGRESS_TEMPLATE,
+                             *YTDLP_SPEEDUP_ARGS, self.url]
+                returncode, tail = _run_streamed(audio_cmd, self._handle_audio_line,
+                                                 on_spawn=self._set_process)
+                if returncode != 0:
+                    self._error(f"Error downloading audio: {tail}")
+                    return False
+
+            self._log("Audio download complete!")
+            return True
+
+        self.signals.status.emit("Downloading MP3 (audio)...")
+        self._log("\nDownloading MP3 audio...")
+
+        if YoutubeDL is not None:
+            ydl_opts = {
+                'quiet': True,
+                'noprogress': True,
+                'format': 'bestaudio/best',
+                'outtmpl': output_template,
+                'progress_hooks': [self._cancel_hook],
+                'extractor_args': {'youtube': {'player_client': ['android']}},
+                'cachedir': YTDLP_CACHE_DIR,
+                'postprocessors': [{
+                    'key': 'FFmpegExtractAudio',
+                    'preferredcodec': 'mp3',
+                    'preferredquality': '0',
+                }],
+            }
+            try:
+                self._api_download(ydl_opts)
+            except Exception as e:
+                self._error(f"Error downloading audio: {e}")
+                return False
+
+            self._log("MP3 download complete!")
+            return True
+
+        # Fall back to the yt-dlp binary when the module is not importable
+        audio_cmd = [
+            "yt-dlp",
+            "-x",  # Extract audio
+            "--audio-format", "mp3",
+            "--audio-quality", "0",  # Best quality
+            "-o", output_template,
+            "--newline",
+            "--progress-template", PROGRESS_TEMPLATE,
+            *YTDLP_SPEEDUP_ARGS,
+            self.url
+        ]
+        returncode, tail = _run_streamed(audio_cmd, self._handle_audio_line,
+                                         on_spawn=self._set_process)
+
+        if returncode != 0:
+            self._error(f"Error downloading audio: {tail}")
+            return False
+
+        self._log("MP3 download complete!")
+        return True
+
     def run(self):
         try:
             # Check dependencies first
             missing_deps = self.check_dependencies()
             if missing_deps:
                 dep_msg = ", ".join(missing_deps)
-                self.signals.error.emit(
+                self._error(
                     f"Missing required dependencies: {dep_msg}\n\n"
                     "To install them on macOS using Homebrew:\n"
                     "brew install " + " ".join(missing_deps)
                 )
                 return
-                
+
             # Create the output directory if it doesn't exist
-            if not os.path.exists(self.output_path):
-                os.makedirs(self.output_path)
-            
-            # Get video info
-            video_info = self.get_video_info()
-            if not video_info:
-                return
-            
-            # Get video title
-            video_title = video_info.get('title', 'video')
-            sanitized_title = sanitize_filename(video_title)
-            
-            self.signals.status.emit(f"Downloading: {video_title}")
-            
-            # File paths
-            video_file = os.path.join(self.output_path, f"{sanitized_title}.mp4")
-            audio_file = os.path.join(self.output_path, f"{sanitized_title}.mp3")
-            
-            # Download video if requested
-            if self.download_video:
-                self.signals.status.emit("Downloading MP4 (video)...")
-                self.signals.log.emit("\nDownloading video...")
-                
-                video_cmd = [
-                    "yt-dlp", 
-                    "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best", 
-                    "-o", video_file,
-                    "--progress",
-                    self.url
-                ]
-                
-                self.signals.progress.emit(30)
-                process = subprocess.Popen(
-                    video_cmd, 
-                    stdout=subprocess.PIPE, 
-                    stderr=subprocess.STDOUT,
-                    universal_newlines=True
-                )
-                
-                # Process output and update progress
-                while True:
-                    line = process.stdout.readline()
-                    if not line and process.poll() is not None:
-                        break
-                    if line:
-                        self.signals.log.emit(line.strip())
-                        # Try to parse progress if available
-                        if "%" in line:
-                            try:
-                                progress_str = line.split('%')[0].strip().split(' ')[-1]
-                                progress = float(progress_str)
-                                # Scale progress to 30-70 range
-                                scaled_progress = 30 + (progress * 0.4)
-                                self.signals.progress.emit(int(scaled_progress))
-                            except:
-                                pass
-                
-                if process.returncode != 0:
-                    # Try simpler format selection if first attempt fails
-                    self.signals.status.emit("Trying alternative video format...")
-                    self.signals.log.emit("\nTrying alternative video format...")
-                    
-                    video_cmd = ["yt-dlp", "-f", "best", "-o", video_file, self.url]
-                    process = subprocess.run(video_cmd, capture_output=True, text=True)
-                    
-                    if process.returncode != 0:
-                        self.signals.error.emit(f"Error downloading video: {process.stderr}")
-                        return
-                
-                self.signals.log.emit("MP4 download complete!")
-            
-            # Extract/download audio if requested
-            if self.download_audio:
-                self.signals.status.emit("Extracting MP3 (audio)...")
-                self.signals.log.emit("\nExtracting MP3 audio...")
-                self.signals.progress.emit(70)
-                
-                if self.download_video:
-                    # Extract audio from the downloaded video
-                    audio_cmd = [
-                        "ffmpeg",
-                        "-i", video_file,
-                        "-vn",  # No video
-                        "-acodec", "libmp3lame",
-                        "-q:a", "2",  # High quality audio
-                        audio_file,
-                        "-y"  # Overwrite if exists
-                    ]
-                    process = subprocess.run(audio_cmd, capture_output=True, text=True)
-                    
-                    if process.returncode != 0:
-                        self.signals.error.emit(f"Error extracting audio: {process.stderr}")
-                        return
-                else:
-                    # If only audio is needed, download it directly
-                    audio_cmd = [
-                        "yt-dlp",
-                        "-x",  # Extract audio
-                        "--audio-format", "mp3",
-                        "--audio-quality", "0",  # Best quality
-                        "-o", audio_file,
-                        self.url
-                    ]
-                    process = subprocess.run(audio_cmd, capture_output=True, text=True)
-                    
-                    if process.returncode != 0:
-                        self.signals.error.emit(f"Error downloading audio: {process.stderr}")
-                        return
-                
-                self.signals.log.emit("MP3 extraction complete!")
-            
-            self.signals.progress.emit(100)
+            os.makedirs(self.output_path, exist_ok=True)
+
+            output_template = os.path.join(self.output_path, "%(title)s.%(ext)s")
+            self.video_file = None
+            self.video_info = None
+
+            # On a cache hit the title is known instantly, with no
+            # "Getting video information..." round-trip
+            cached_info = get_cached_info(self.url)
+            if cached_info:
+                self.signals.cache_hit.emit(cached_info.get('title', 'video'))
+                self.video_info = cached_info
+
+            if self.download_video and self.download_audio and self.audio_mode == 'remux':
+                # Remux copies the audio out of the already-downloaded video,
+                # so there is no second download and no re-encode
+                if not self._download_video_task(output_template):
+                    return
+                if not _MEDIA_POOL.submit(self._remux_audio_task).result():
+                    return
+            elif self.download_video and self.download_audio:
+                # One yt-dlp invocation downloads the video and extracts the
+                # MP3 from the already-demuxed audio stream (--keep-video -x):
+                # a single network fetch and a single pass over the bytes on
+                # disk, with no second subprocess to schedule.
+                if not self._download_video_task(output_template, extract_mp3=True):
+                    return
+            elif self.download_video:
+                if not self._download_video_task(output_template):
+                    return
+            elif self.download_audio:
+                if not self._download_audio_task(output_template):
+                    return
+
+            self._emit_progress(100)
             self.signals.status.emit("Download complete!")
             self.signals.finished.emit(self.output_path)
-            
+
         except Exception as e:
-            self.signals.error.emit(f"Error: {str(e)}")
+            self._error(f"Error: {str(e)}")
 
 
 class YouTubeDownloaderApp(QMainWindow):
@@ -212,14 +698,30 @@ class YouTubeDownloaderApp(QMainWindow):
         super().__init__()
         self.setWindowTitle("YouTube Downloader (yt-dlp + ffmpeg)")
         self.setMinimumSize(700, 400)
+        self.worker = None
+        self.log_timer = None
         
         # Initialize UI
         self.init_ui()
         
         # Set default download path
         self.output_path_edit.setText(os.path.join(os.path.expanduser("~"), "Downloads"))
+
+        # One PATH scan at startup; _which caches the results for the workers
+        missing_deps = _missing_dependencies()
+        if missing_deps:
+            self.download_btn.setEnabled(False)
+            self.update_status(
+                "Missing dependencies: " + ", ".join(missing_deps) +
+                " — install them and restart"
+            )
         
     def init_ui(self):
+        # Menu bar
+        tools_menu = self.menuBar().addMenu("Tools")
+        clear_cache_action = tools_menu.addAction("Clear metadata cache")
+        clear_cache_action.triggered.connect(self.clear_metadata_cache)
+
         # Main widget and layout
         main_widget = QWidget()
         main_layout = QVBoxLayout()
@@ -269,19 +771,35 @@ class YouTubeDownloaderApp(QMainWindow):
         
         self.mp4_checkbox = QCheckBox("Download MP4 Video")
         self.mp4_checkbox.setChecked(True)
-        self.mp3_checkbox = QCheckBox("Extract MP3 Audio")
+        self.mp3_checkbox = QCheckBox("Extract Audio")
         self.mp3_checkbox.setChecked(True)
-        
+
+        self.audio_mp3_radio = QRadioButton("MP3 (re-encode)")
+        self.audio_mp3_radio.setChecked(True)
+        self.audio_remux_radio = QRadioButton("Remux (faster, keeps source codec)")
+
         options_layout.addWidget(self.mp4_checkbox)
         options_layout.addWidget(self.mp3_checkbox)
+        options_layout.addWidget(self.audio_mp3_radio)
+        options_layout.addWidget(self.audio_remux_radio)
         
         main_layout.addWidget(options_group)
         
-        # Download Button
+        # Download / Cancel Buttons
+        buttons_layout = QHBoxLayout()
+
         self.download_btn = QPushButton("Download")
         self.download_btn.clicked.connect(self.start_download)
         self.download_btn.setMinimumHeight(40)
-        main_layout.addWidget(self.download_btn)
+
+        self.cancel_btn = QPushButton("Cancel")
+        self.cancel_btn.clicked.connect(self.cancel_download)
+        self.cancel_btn.setMinimumHeight(40)
+        self.cancel_btn.setEnabled(False)
+
+        buttons_layout.addWidget(self.download_btn)
+        buttons_layout.addWidget(self.cancel_btn)
+        main_layout.addLayout(buttons_layout)
         
         # Progress
         progress_group = QGroupBox("Download Progress")
@@ -302,13 +820,14 @@ class YouTubeDownloaderApp(QMainWindow):
         log_layout = QVBoxLayout()
         log_group.setLayout(log_layout)
         
-        self.log_label = QLabel()
-        self.log_label.setStyleSheet("background-color: #f0f0f0; padding: 5px; font-family: monospace;")
-        self.log_label.setWordWrap(True)
-        self.log_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
-        self.log_label.setText("Waiting for download to start...")
-        
-        log_layout.addWidget(self.log_label)
+        # QPlainTextEdit appends in O(1) where QLabel re-wraps the whole
+        # accumulated text on every line; the block cap also bounds memory
+        self.log_view = QPlainTextEdit(readOnly=True)
+        self.log_view.setStyleSheet("background-color: #f0f0f0; padding: 5px; font-family: monospace;")
+        self.log_view.setMaximumBlockCount(500)
+        self.log_view.setPlainText("Waiting for download to start...")
+
+        log_layout.addWidget(self.log_view)
         
         main_layout.addWidget(log_group)
     
@@ -322,6 +841,7 @@ class YouTubeDownloaderApp(QMainWindow):
         output_path = self.output_path_edit.text().strip()
         download_mp4 = self.mp4_checkbox.isChecked()
         download_mp3 = self.mp3_checkbox.isChecked()
+        audio_mode = 'remux' if self.audio_remux_radio.isChecked() else 'mp3'
         
         if not url:
             QMessageBox.critical(self, "Error", "Please enter a YouTube URL")
@@ -337,46 +857,106 @@ class YouTubeDownloaderApp(QMainWindow):
         
         # Disable button during download
         self.download_btn.setEnabled(False)
+        self.cancel_btn.setEnabled(True)
         
         # Clear log
-        self.log_label.setText("")
+        self.log_view.clear()
         
         # Create and start the worker thread
-        self.worker = DownloadWorker(url, output_path, download_mp4, download_mp3)
+        self.worker = DownloadWorker(url, output_path, download_mp4, download_mp3,
+                                     audio_mode=audio_mode)
         
         # Connect signals
         self.worker.signals.progress.connect(self.update_progress)
         self.worker.signals.status.connect(self.update_status)
         self.worker.signals.finished.connect(self.download_finished)
         self.worker.signals.error.connect(self.download_error)
-        self.worker.signals.log.connect(self.append_log)
+        self.worker.signals.cancelled.connect(self.download_cancelled)
+        self.worker.signals.cache_hit.connect(self.metadata_cache_hit)
+
+        # Drain worker log lines in 50 ms batches instead of one queued
+        # signal per line
+        self.log_timer = QTimer(self)
+        self.log_timer.setInterval(50)
+        self.log_timer.timeout.connect(self.flush_log)
+        self.log_timer.start()
         
         # Start download
         self.worker.start()
     
+    def metadata_cache_hit(self, title):
+        self.update_status(f"Downloading: {title}")
+
+    def clear_metadata_cache(self):
+        clear_cache()
+        self.update_status("Metadata cache cleared")
+
     def update_progress(self, value):
         self.progress_bar.setValue(value)
     
     def update_status(self, message):
         self.status_label.setText(message)
     
-    def append_log(self, text):
-        current_text = self.log_label.text()
-        self.log_label.setText(current_text + "\n" + text)
+    def flush_log(self):
+        """Drain buffered worker log lines into the view in one append."""
+        lines = []
+        buf = self.worker.log_lines
+        while buf:
+            try:
+                lines.append(buf.popleft())
+            except IndexError:
+                break
+        if lines:
+            self.log_view.appendPlainText("\n".join(lines))
+
+    def stop_log_timer(self):
+        if self.log_timer is not None:
+            self.log_timer.stop()
+        self.flush_log()
     
+    def cancel_download(self):
+        self.cancel_btn.setEnabled(False)
+        if self.worker is not None and self.worker.is_alive():
+            # The worker emits cancelled once it has wound down;
+            # download_cancelled re-enables the Download button then, so a
+            # new download can't race the old worker's signals
+            self.worker.cancel()
+            self.update_status("Cancelling download...")
+        else:
+            self.stop_log_timer()
+            self.download_btn.setEnabled(True)
+
+    def download_cancelled(self):
+        self.stop_log_timer()
+        self.download_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
+
     def download_finished(self, output_path):
+        self.stop_log_timer()
+
         # Re-enable button
         self.download_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
         
         QMessageBox.information(self, "Success", f"Download complete!\nSaved to: {output_path}")
     
     def download_error(self, error_msg):
+        self.stop_log_timer()
+
         # Re-enable button
         self.download_btn.setEnabled(True)
+        self.cancel_btn.setEnabled(False)
         
         self.update_status(f"Error: Download failed")
         QMessageBox.critical(self, "Error", f"Download failed:\n\n{error_msg}")
 
+    def closeEvent(self, event):
+        # Don't leave orphaned yt-dlp/ffmpeg children running after the
+        # window goes away
+        if self.worker is not None and self.worker.is_alive():
+            self.worker.cancel()
+        event.accept()
+
 
 if __name__ == "__main__":
     app = QApplication(sys.argv)